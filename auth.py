@@ -9,8 +9,13 @@ Set AUTH_TYPE environment variable to choose authentication mode.
 """
 
 import os
+import json
+import hashlib
 import logging
-from typing import Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from langgraph_sdk import Auth
 
 logger = logging.getLogger(__name__)
@@ -23,16 +28,19 @@ AUTH_TYPE = os.getenv("AUTH_TYPE", "noop").lower()
 
 if AUTH_TYPE == "noop":
     logger.info("Using noop authentication (no auth required)")
+
+    # Shared user returned for every request; callers copy before mutating
+    ANONYMOUS_USER: Auth.types.MinimalUserDict = {
+        "identity": "anonymous",
+        "display_name": "Anonymous User",
+        "is_authenticated": True
+    }
     
     @auth.authenticate
     async def authenticate(headers: Dict[str, str]) -> Auth.types.MinimalUserDict:
         """No-op authentication that allows all requests."""
         _ = headers  # Suppress unused warning
-        return {
-            "identity": "anonymous",
-            "display_name": "Anonymous User", 
-            "is_authenticated": True
-        }
+        return ANONYMOUS_USER
 
     @auth.on
     async def authorize(ctx: Auth.types.AuthContext, value: Dict[str, Any]) -> Dict[str, Any]:
@@ -46,13 +54,161 @@ elif AUTH_TYPE == "custom":
     # Import jwt here to avoid dependency when using noop mode
     try:
         import jwt
+        from jwt.algorithms import HMACAlgorithm
+        from jwt.exceptions import InvalidJTIError, InvalidSubjectError
+        from jwt.utils import base64url_decode
     except ImportError:
         logger.error("PyJWT not installed. Run: pip install pyjwt")
         raise
+
+    # orjson (installed with langgraph) parses token JSON much faster than stdlib
+    try:
+        from orjson import loads as _json_loads
+    except ImportError:
+        _json_loads = json.loads
     
     # Get JWT secret from environment (use BrainCore backend secret)
     JWT_SECRET = os.getenv("SECRET_KEY", "mock-secret-key-for-migrations")
-    
+
+    # Development switches are read once at import rather than per request
+    ALLOW_ANONYMOUS = os.getenv("ALLOW_ANONYMOUS", "false").lower() == "true"
+    IS_DEVELOPMENT = os.getenv("NODE_ENV") == "development"
+
+    # HS256 algorithm and signing key are prepared once instead of per decode
+    _hs256 = HMACAlgorithm(HMACAlgorithm.SHA256)
+    _jwt_key = _hs256.prepare_key(JWT_SECRET)
+
+    def _decode_jwt_hs256(token: str) -> Dict[str, Any]:
+        """
+        Verify an HS256 JWT and return its payload.
+
+        Equivalent to ``jwt.decode(token, JWT_SECRET, algorithms=["HS256"])``
+        with the default options, and raises the same PyJWT exceptions.
+        """
+        try:
+            signing_input, crypto_segment = token.encode("ascii").rsplit(b".", 1)
+            header_segment, payload_segment = signing_input.split(b".", 1)
+        except (UnicodeEncodeError, ValueError):
+            raise jwt.DecodeError("Not enough segments")
+
+        # Only the header is parsed before the signature is verified; the
+        # payload JSON is untrusted until then (same order as PyJWS)
+        try:
+            header = _json_loads(base64url_decode(header_segment))
+            payload_data = base64url_decode(payload_segment)
+            signature = base64url_decode(crypto_segment)
+        except (TypeError, ValueError) as e:
+            raise jwt.DecodeError(f"Invalid token encoding: {e}") from e
+
+        if not isinstance(header, dict):
+            raise jwt.DecodeError("Invalid header string: must be a json object")
+
+        if header.get("alg") != "HS256":
+            raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+
+        if not _hs256.verify(signing_input, _jwt_key, signature):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+
+        try:
+            payload = _json_loads(payload_data)
+        except ValueError as e:
+            raise jwt.DecodeError(f"Invalid payload string: {e}") from e
+
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+
+        # Same checks, in the same order, as PyJWT's default decode options
+        now = time.time()
+        if "iat" in payload:
+            try:
+                iat = int(payload["iat"])
+            except (TypeError, ValueError):
+                raise jwt.InvalidIssuedAtError("Issued At claim (iat) must be an integer.")
+            if iat > now:
+                raise jwt.ImmatureSignatureError("The token is not yet valid (iat)")
+        if "nbf" in payload:
+            try:
+                nbf = int(payload["nbf"])
+            except (TypeError, ValueError):
+                raise jwt.DecodeError("Not Before claim (nbf) must be an integer.")
+            if nbf > now:
+                raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+        if "exp" in payload:
+            try:
+                exp = int(payload["exp"])
+            except (TypeError, ValueError):
+                raise jwt.DecodeError("Expiration Time claim (exp) must be an integer.")
+            if exp <= now:
+                raise jwt.ExpiredSignatureError("Signature has expired")
+        if payload.get("aud"):
+            # No audience is configured, so audience-bound tokens are rejected
+            raise jwt.InvalidAudienceError("Invalid audience")
+        if "sub" in payload and not isinstance(payload["sub"], str):
+            raise InvalidSubjectError("Subject must be a string")
+        if "jti" in payload and not isinstance(payload["jti"], str):
+            raise InvalidJTIError("JWT ID must be a string")
+
+        return payload
+
+    # Fixed users for the anonymous/development fallbacks; callers copy before mutating
+    ANONYMOUS_USER: Auth.types.MinimalUserDict = {
+        "identity": "anonymous",
+        "display_name": "Anonymous User",
+        "is_authenticated": False
+    }
+    DEV_USER: Auth.types.MinimalUserDict = {
+        "identity": "dev-user",
+        "display_name": "Development User",
+        "is_authenticated": True
+    }
+    DEV_USER_INVALID_TOKEN: Auth.types.MinimalUserDict = {
+        "identity": "dev-user-invalid-token",
+        "display_name": "Dev User (Invalid Token)",
+        "is_authenticated": True
+    }
+
+    # Verified tokens are cached so repeated requests with the same bearer token
+    # skip JWT decoding. Entries expire after TOKEN_CACHE_TTL seconds or at the
+    # token's own "exp" claim, whichever comes first.
+    TOKEN_CACHE_MAXSIZE = 10000
+    TOKEN_CACHE_TTL = 30
+
+    _token_cache: "OrderedDict[bytes, Tuple[Auth.types.MinimalUserDict, float]]" = OrderedDict()
+    _token_cache_lock = threading.Lock()
+
+    def _token_cache_key(token: str) -> bytes:
+        """Hash the token so raw credentials are not kept in memory."""
+        return hashlib.sha256(token.encode()).digest()[:16]
+
+    def _get_cached_user(key: bytes) -> Optional[Auth.types.MinimalUserDict]:
+        """Return the cached user for a token key, or None if missing/expired."""
+        now = time.time()
+        with _token_cache_lock:
+            entry = _token_cache.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del _token_cache[key]
+                return None
+            _token_cache.move_to_end(key)
+            return user
+
+    def _cache_user(key: bytes, user: Auth.types.MinimalUserDict, exp: Any) -> None:
+        """Store a verified user, bounded by TTL, token expiry and cache size."""
+        expires_at = time.time() + TOKEN_CACHE_TTL
+        if exp is not None:
+            # Same int() coercion the decoder uses, so e.g. "1700000000" counts
+            try:
+                expires_at = min(expires_at, int(exp))
+            except (TypeError, ValueError):
+                pass
+        with _token_cache_lock:
+            _token_cache[key] = (user, expires_at)
+            _token_cache.move_to_end(key)
+            if len(_token_cache) > TOKEN_CACHE_MAXSIZE:
+                _token_cache.popitem(last=False)
+
     @auth.authenticate
     async def authenticate(headers: Dict[str, str]) -> Auth.types.MinimalUserDict:
         """
@@ -60,7 +216,8 @@ elif AUTH_TYPE == "custom":
 
         This validates tokens from NextAuth.js used in the BrainCore frontend.
         """
-        # Extract authorization header
+        # Extract authorization header. The middleware passes lowercase str
+        # keys, so the first lookup hits; the rest are fallbacks for other callers.
         authorization = (
             headers.get("authorization") or
             headers.get("Authorization") or
@@ -75,12 +232,8 @@ elif AUTH_TYPE == "custom":
         if not authorization:
             logger.warning("Missing Authorization header")
             # For development, allow anonymous access even in custom mode
-            if os.getenv("ALLOW_ANONYMOUS", "false").lower() == "true":
-                return {
-                    "identity": "anonymous",
-                    "display_name": "Anonymous User",
-                    "is_authenticated": False
-                }
+            if ALLOW_ANONYMOUS:
+                return ANONYMOUS_USER
             raise Auth.exceptions.HTTPException(
                 status_code=401,
                 detail="Authorization header required"
@@ -93,7 +246,7 @@ elif AUTH_TYPE == "custom":
                 detail="Invalid authorization format. Expected 'Bearer <token>'"
             )
         
-        token = authorization.replace("Bearer ", "")
+        token = authorization[7:]  # len("Bearer ")
         
         # For development/testing with dummy tokens
         if token.startswith("anonymous") or token.startswith("noop-"):
@@ -108,36 +261,32 @@ elif AUTH_TYPE == "custom":
         if not JWT_SECRET:
             logger.error("JWT_SECRET not configured")
             # Fallback for development
-            if os.getenv("NODE_ENV") == "development":
-                return {
-                    "identity": "dev-user",
-                    "display_name": "Development User",
-                    "is_authenticated": True
-                }
+            if IS_DEVELOPMENT:
+                return DEV_USER
             raise Auth.exceptions.HTTPException(
                 status_code=500,
                 detail="Authentication not properly configured"
             )
-        
-        try:
-            # Debug: Log the token and secret being used
-            logger.info(f"Token length: {len(token)}")
-            logger.info(f"JWT_SECRET being used: {JWT_SECRET[:10]}..." if JWT_SECRET else "No JWT_SECRET")
 
-            # Debug: Try to decode without verification to see payload
-            try:
-                unverified_payload = jwt.decode(token, options={"verify_signature": False})
-                logger.info(f"Token payload (unverified): {unverified_payload}")
-            except Exception as e:
-                logger.warning(f"Could not decode token without verification: {e}")
+        # Fast path: token already verified recently
+        cache_key = _token_cache_key(token)
+        cached_user = _get_cached_user(cache_key)
+        if cached_user is not None:
+            return cached_user
+
+        try:
+            # Debug: inspect the token without verification (skipped unless DEBUG)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Token length: %d", len(token))
+                try:
+                    unverified_payload = jwt.decode(token, options={"verify_signature": False})
+                    logger.debug("Token payload (unverified): %s", unverified_payload)
+                except Exception as e:
+                    logger.debug("Could not decode token without verification: %s", e)
 
             # Decode BrainCore backend JWT
             # BrainCore backend uses HS256
-            payload = jwt.decode(
-                token,
-                JWT_SECRET,
-                algorithms=["HS256"]
-            )
+            payload = _decode_jwt_hs256(token)
             
             # Extract user information from BrainCore backend token
             # BrainCore uses different field names
@@ -146,14 +295,14 @@ elif AUTH_TYPE == "custom":
             name = payload.get("name") or payload.get("username")
             
             if not user_id:
-                logger.error(f"No user ID in token payload: {payload}")
+                logger.error("No user ID in token payload: %s", payload)
                 raise Auth.exceptions.HTTPException(
                     status_code=401,
                     detail="Invalid token: missing user identity"
                 )
             
             # Return user information for LangGraph
-            return {
+            user: Auth.types.MinimalUserDict = {
                 "identity": str(user_id),
                 "display_name": name or email or str(user_id),
                 "email": email,
@@ -167,7 +316,9 @@ elif AUTH_TYPE == "custom":
                     "family_id": payload.get("familyId"),
                 }
             }
-            
+            _cache_user(cache_key, user, payload.get("exp"))
+            return user
+
         except jwt.ExpiredSignatureError:
             logger.warning("Token expired")
             raise Auth.exceptions.HTTPException(
@@ -175,20 +326,16 @@ elif AUTH_TYPE == "custom":
                 detail="Token expired"
             )
         except jwt.InvalidTokenError as e:
-            logger.warning(f"Invalid token: {e}")
+            logger.warning("Invalid token: %s", e)
             # In development, be more lenient
-            if os.getenv("NODE_ENV") == "development":
-                return {
-                    "identity": "dev-user-invalid-token",
-                    "display_name": "Dev User (Invalid Token)",
-                    "is_authenticated": True
-                }
+            if IS_DEVELOPMENT:
+                return DEV_USER_INVALID_TOKEN
             raise Auth.exceptions.HTTPException(
                 status_code=401,
                 detail="Invalid authentication token"
             )
         except Exception as e:
-            logger.error(f"Authentication error: {e}", exc_info=True)
+            logger.error("Authentication error: %s", e, exc_info=True)
             raise Auth.exceptions.HTTPException(
                 status_code=500,
                 detail="Authentication system error"
@@ -214,8 +361,7 @@ elif AUTH_TYPE == "custom":
             owner_filter = {"owner": user_id}
             
             # Add owner information to metadata for create/update operations
-            metadata = value.setdefault("metadata", {})
-            metadata.update(owner_filter)
+            value.setdefault("metadata", {})["owner"] = user_id
             
             # Return filter for database operations
             return owner_filter
@@ -223,7 +369,7 @@ elif AUTH_TYPE == "custom":
         except Auth.exceptions.HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Authorization error: {e}", exc_info=True)
+            logger.error("Authorization error: %s", e, exc_info=True)
             raise Auth.exceptions.HTTPException(
                 status_code=500,
                 detail="Authorization system error"
@@ -4,16 +4,38 @@ Provides scoring, datasets, and improved metadata tracking.
 """
 
 import os
+import time
 import logging
-from typing import Optional, Dict, Any, List
-from contextlib import contextmanager
-from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from functools import wraps
 
 logger = logging.getLogger(__name__)
 
 _LANGFUSE_LOGGING_ENABLED = os.getenv("LANGFUSE_LOGGING", "false").lower() == "true"
 _langfuse_client = None
 _langfuse_handler = None
+_EMPTY_CALLBACKS: Tuple = ()
+# Reusable context manager yielding None, used when tracing is disabled
+_NULL_TRACE = nullcontext()
+
+# Tags attached to every agent run trace
+_STATIC_RUN_TAGS = ("aegra_run",)
+
+
+# (epoch second, ISO string) of the last formatted timestamp; replaced atomically
+_last_timestamp: Tuple[int, str] = (-1, "")
+
+
+def _utc_timestamp() -> str:
+    """Return the current UTC time as an ISO 8601 string with second resolution."""
+    global _last_timestamp
+    now = int(time.time())
+    last_second, last_iso = _last_timestamp
+    if now != last_second:
+        last_iso = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(now))
+        _last_timestamp = (now, last_iso)
+    return last_iso
 
 
 class LangfuseEnhanced:
@@ -27,6 +49,11 @@ class LangfuseEnhanced:
         if self.enabled:
             self._initialize()
 
+        # Callbacks never change after initialization, so build them once
+        self._callbacks: Tuple = (
+            (self.handler,) if self.enabled and self.handler else _EMPTY_CALLBACKS
+        )
+
     def _initialize(self):
         """Initialize Langfuse client and handler."""
         global _langfuse_client, _langfuse_handler
@@ -41,8 +68,9 @@ class LangfuseEnhanced:
 
             if missing_vars:
                 logger.warning(
-                    f"LANGFUSE_LOGGING is enabled but missing required environment variables: {missing_vars}. "
-                    "Please set these in your .env file."
+                    "LANGFUSE_LOGGING is enabled but missing required environment variables: %s. "
+                    "Please set these in your .env file.",
+                    missing_vars
                 )
                 self.enabled = False
                 return
@@ -76,10 +104,10 @@ class LangfuseEnhanced:
             )
             self.enabled = False
         except Exception as e:
-            logger.error(f"Failed to initialize Langfuse: {e}")
+            logger.error("Failed to initialize Langfuse: %s", e)
             self.enabled = False
 
-    def get_callbacks(self, metadata: Optional[Dict[str, Any]] = None) -> List:
+    def get_callbacks(self, metadata: Optional[Dict[str, Any]] = None) -> Tuple:
         """
         Get callbacks with optional metadata for LangGraph execution.
 
@@ -87,13 +115,10 @@ class LangfuseEnhanced:
             metadata: Optional metadata to include in traces
 
         Returns:
-            List of callbacks for LangGraph/LangChain
+            Shared tuple of callbacks for LangGraph/LangChain (empty if disabled)
         """
-        if not self.enabled or not self.handler:
-            return []
-
         # Note: Metadata will be passed through config in actual execution
-        return [self.handler]
+        return self._callbacks
 
     @contextmanager
     def trace_agent_run(
@@ -121,24 +146,21 @@ class LangfuseEnhanced:
         try:
             # Build comprehensive tags
             tags = [
-                "aegra_run",
-                f"agent:{agent_name}",
-                f"thread:{thread_id}"
+                tag for tag in (
+                    *_STATIC_RUN_TAGS,
+                    f"agent:{agent_name}",
+                    f"thread:{thread_id}",
+                    run_id and f"run:{run_id}",
+                    user_id and f"user:{user_id}"
+                ) if tag
             ]
 
-            if run_id:
-                tags.append(f"run:{run_id}")
-
-            if user_id:
-                tags.append(f"user:{user_id}")
-
             # Add timestamp to metadata
-            enhanced_metadata = {
-                "agent_name": agent_name,
-                "thread_id": thread_id,
-                "timestamp": datetime.utcnow().isoformat(),
-                **(metadata or {})
-            }
+            # (caller-supplied keys take precedence, as before)
+            enhanced_metadata = metadata.copy() if metadata else {}
+            enhanced_metadata.setdefault("agent_name", agent_name)
+            enhanced_metadata.setdefault("thread_id", thread_id)
+            enhanced_metadata.setdefault("timestamp", _utc_timestamp())
 
             # Create span with enhanced metadata
             with self.client.start_as_current_span(
@@ -152,7 +174,7 @@ class LangfuseEnhanced:
                 yield span
 
         except Exception as e:
-            logger.error(f"Error in Langfuse trace context: {e}")
+            logger.error("Error in Langfuse trace context: %s", e)
             yield None
 
     def score_trace(
@@ -184,9 +206,9 @@ class LangfuseEnhanced:
                 data_type=data_type,
                 comment=comment
             )
-            logger.debug(f"Created score '{name}' for trace {trace_id}")
+            logger.debug("Created score '%s' for trace %s", name, trace_id)
         except Exception as e:
-            logger.error(f"Error scoring trace: {e}")
+            logger.error("Error scoring trace: %s", e)
 
     def log_user_feedback(
         self,
@@ -260,14 +282,14 @@ class LangfuseEnhanced:
                 description=description,
                 metadata={
                     "created_by": "aegra",
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": _utc_timestamp(),
                     **(metadata or {})
                 }
             )
-            logger.info(f"Created Langfuse dataset: {name}")
+            logger.info("Created Langfuse dataset: %s", name)
             return dataset
         except Exception as e:
-            logger.error(f"Error creating dataset: {e}")
+            logger.error("Error creating dataset: %s", e)
             return None
 
     def add_dataset_item(
@@ -299,10 +321,10 @@ class LangfuseEnhanced:
                 expected_output=expected_output,
                 metadata=metadata
             )
-            logger.debug(f"Added item to dataset: {dataset_name}")
+            logger.debug("Added item to dataset: %s", dataset_name)
             return item
         except Exception as e:
-            logger.error(f"Error adding dataset item: {e}")
+            logger.error("Error adding dataset item: %s", e)
             return None
 
     def run_on_dataset(
@@ -344,7 +366,7 @@ class LangfuseEnhanced:
                             item.input,
                             config={
                                 **(config or {}),
-                                "callbacks": self.get_callbacks()
+                                "callbacks": list(self.get_callbacks())
                             }
                         )
 
@@ -363,18 +385,18 @@ class LangfuseEnhanced:
                         })
 
                     except Exception as e:
-                        logger.error(f"Error running item {item.id}: {e}")
+                        logger.error("Error running item %s: %s", item.id, e)
                         span.update(output={"error": str(e)})
                         results.append({
                             "input": item.input,
                             "error": str(e)
                         })
 
-            logger.info(f"Completed dataset run '{run_name}' on {len(results)} items")
+            logger.info("Completed dataset run '%s' on %d items", run_name, len(results))
             return results
 
         except Exception as e:
-            logger.error(f"Error running on dataset: {e}")
+            logger.error("Error running on dataset: %s", e)
             return []
 
     def flush(self):
@@ -384,23 +406,127 @@ class LangfuseEnhanced:
                 self.client.flush()
                 logger.debug("Flushed Langfuse data")
             except Exception as e:
-                logger.error(f"Error flushing Langfuse data: {e}")
+                logger.error("Error flushing Langfuse data: %s", e)
+
+
+class _NoopLangfuse(LangfuseEnhanced):
+    """Stand-in used when Langfuse is disabled; every operation does nothing."""
+
+    def __init__(self):
+        self.enabled = False
+        self.client = None
+        self.handler = None
+        self._callbacks = _EMPTY_CALLBACKS
+
+    def trace_agent_run(
+        self,
+        agent_name: str,
+        thread_id: str,
+        run_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> AbstractContextManager:
+        return _NULL_TRACE
+
+    def score_trace(
+        self,
+        trace_id: str,
+        name: str,
+        value: float,
+        data_type: str = "NUMERIC",
+        comment: Optional[str] = None
+    ):
+        return None
 
+    def log_user_feedback(
+        self,
+        trace_id: str,
+        feedback_value: int,
+        comment: Optional[str] = None
+    ):
+        return None
 
-# Global singleton instance
+    def log_llm_judge_score(
+        self,
+        trace_id: str,
+        evaluation_name: str,
+        score: float,
+        reasoning: Optional[str] = None
+    ):
+        return None
+
+    def create_dataset(
+        self,
+        name: str,
+        description: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        return None
+
+    def add_dataset_item(
+        self,
+        dataset_name: str,
+        input_data: Dict[str, Any],
+        expected_output: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        return None
+
+    def run_on_dataset(
+        self,
+        dataset_name: str,
+        run_name: str,
+        agent_executor,
+        config: Optional[Dict[str, Any]] = None
+    ):
+        logger.warning("Langfuse not enabled, skipping dataset run")
+        return []
+
+    def flush(self):
+        return None
+
+
+# Global singleton instance (set back to None to force re-creation)
 _enhanced_instance = None
 
 
-def get_enhanced_langfuse() -> LangfuseEnhanced:
-    """Get or create the global enhanced Langfuse instance."""
+def _create_enhanced_langfuse() -> LangfuseEnhanced:
+    """Create the singleton, falling back to the no-op instance when disabled."""
     global _enhanced_instance
-    if _enhanced_instance is None:
-        _enhanced_instance = LangfuseEnhanced()
-    return _enhanced_instance
+    instance = LangfuseEnhanced() if _LANGFUSE_LOGGING_ENABLED else None
+    if instance is None or not instance.enabled or not instance.client:
+        instance = _NoopLangfuse()
+    _enhanced_instance = instance
+    return instance
+
+
+# Fast path installed after the first call; the global stays authoritative
+def _get_enhanced_instance() -> LangfuseEnhanced:
+    return _enhanced_instance or _create_enhanced_langfuse()
+
+
+def get_enhanced_langfuse() -> LangfuseEnhanced:
+    """
+    Get or create the global enhanced Langfuse instance.
+
+    Returns a no-op instance when LANGFUSE_LOGGING is off or Langfuse
+    failed to initialize.
+    """
+    global get_enhanced_langfuse
+    instance = _enhanced_instance or _create_enhanced_langfuse()
+
+    # Later calls through the module skip this body. Both paths read
+    # _enhanced_instance, so references imported earlier stay consistent.
+    get_enhanced_langfuse = _get_enhanced_instance
+    return instance
+
+
+# The fast path keeps the public name and docstring once swapped in
+wraps(get_enhanced_langfuse)(_get_enhanced_instance)
 
 
 # Convenience functions for backward compatibility
-def get_tracing_callbacks(metadata: Optional[Dict[str, Any]] = None) -> List:
+def get_tracing_callbacks(metadata: Optional[Dict[str, Any]] = None) -> list:
     """
     Get tracing callbacks (backward compatible with existing code).
 
@@ -408,20 +534,22 @@ def get_tracing_callbacks(metadata: Optional[Dict[str, Any]] = None) -> List:
         metadata: Optional metadata to include
 
     Returns:
-        List of callbacks for LangGraph execution
+        List of callbacks for LangGraph execution (a new list each call)
     """
+    if not _LANGFUSE_LOGGING_ENABLED:
+        return []
+
     instance = get_enhanced_langfuse()
-    return instance.get_callbacks(metadata)
+    return list(instance.get_callbacks(metadata))
 
 
-@contextmanager
 def trace_agent_run(
     agent_name: str,
     thread_id: str,
     run_id: Optional[str] = None,
     user_id: Optional[str] = None,
     metadata: Optional[Dict[str, Any]] = None
-):
+) -> AbstractContextManager:
     """
     Convenience context manager for tracing agent runs.
 
@@ -432,5 +560,4 @@ def trace_agent_run(
                 span.update(output=result)
     """
     instance = get_enhanced_langfuse()
-    with instance.trace_agent_run(agent_name, thread_id, run_id, user_id, metadata) as span:
-        yield span
\ No newline at end of file
+    return instance.trace_agent_run(agent_name, thread_id, run_id, user_id, metadata)
@@ -5,13 +5,6 @@ Test script to verify Langfuse integration with Aegra/LangGraph
 
 import os
 import asyncio
-from langfuse import Langfuse
-from langfuse.langchain import CallbackHandler
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
-from langgraph.graph import StateGraph, START, END
-from typing import TypedDict, Annotated
-from langgraph.graph.message import add_messages
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -27,29 +20,40 @@ if public_key:
 else:
     print("LANGFUSE_PUBLIC_KEY: Not set!")
 
-# Initialize Langfuse client
-langfuse = Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3001")
-)
 
-# Verify connection
-if langfuse.auth_check():
-    print("✅ Langfuse client authenticated successfully!")
-else:
-    print("❌ Failed to authenticate with Langfuse")
-    exit(1)
+# Heavy dependencies (langfuse, langchain, langgraph) are imported inside the
+# functions below so the configuration check above stays fast.
+def create_langfuse_client():
+    """Create and authenticate the Langfuse client"""
+    from langfuse import Langfuse
+
+    # Initialize Langfuse client
+    langfuse = Langfuse(
+        public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
+        secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
+        host=os.getenv("LANGFUSE_HOST", "http://localhost:3001")
+    )
 
-# Create Langfuse callback handler
-langfuse_handler = CallbackHandler()
+    # Verify connection
+    if langfuse.auth_check():
+        print("✅ Langfuse client authenticated successfully!")
+    else:
+        print("❌ Failed to authenticate with Langfuse")
+        exit(1)
 
-# Define a simple LangGraph agent
-class State(TypedDict):
-    messages: Annotated[list, add_messages]
+    return langfuse
 
 # Create the graph
 def create_test_graph():
+    from typing import TypedDict, Annotated
+    from langchain_openai import ChatOpenAI
+    from langgraph.graph import StateGraph, START, END
+    from langgraph.graph.message import add_messages
+
+    # Define a simple LangGraph agent
+    class State(TypedDict):
+        messages: Annotated[list, add_messages]
+
     builder = StateGraph(State)
 
     # Initialize LLM
@@ -69,6 +73,14 @@ def create_test_graph():
 
 async def test_agent():
     """Test the agent with Langfuse tracing"""
+    from langchain_core.messages import HumanMessage
+    from langfuse.langchain import CallbackHandler
+
+    langfuse = create_langfuse_client()
+
+    # Create Langfuse callback handler
+    langfuse_handler = CallbackHandler()
+
     print("\n🚀 Testing LangGraph agent with Langfuse tracing...")
 
     # Create the graph
@@ -105,4 +117,4 @@ if __name__ == "__main__":
     asyncio.run(test_agent())
 
     print("\n🎉 Test completed! Check Langfuse UI for the trace.")
-    print(f"   URL: {os.getenv('LANGFUSE_HOST')}/project/default")
\ No newline at end of file
+    print(f"   URL: {os.getenv('LANGFUSE_HOST')}/project/default")
@@ -0,0 +1,194 @@
+"""
+Unit tests for the custom (JWT) authentication mode in auth.py.
+Tests HS256 decoder parity with PyJWT and the verified-token cache.
+"""
+import hashlib
+import hmac
+import importlib.util
+import time
+from pathlib import Path
+
+import jwt
+import pytest
+
+AUTH_PATH = Path(__file__).resolve().parents[2] / "auth.py"
+SECRET = "test-secret-key-that-is-at-least-32-bytes"
+
+
+@pytest.fixture
+def auth_module(monkeypatch):
+    """Load auth.py in custom mode with a known secret."""
+    monkeypatch.setenv("AUTH_TYPE", "custom")
+    monkeypatch.setenv("SECRET_KEY", SECRET)
+    monkeypatch.delenv("ALLOW_ANONYMOUS", raising=False)
+    monkeypatch.delenv("NODE_ENV", raising=False)
+
+    spec = importlib.util.spec_from_file_location("auth_custom_under_test", AUTH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _encode(payload, key=SECRET, algorithm="HS256"):
+    return jwt.encode(payload, key, algorithm=algorithm)
+
+
+def _forge(payload: bytes, key="another-secret-that-is-32-bytes-long"):
+    """Build an HS256 token around raw payload bytes, signed with ``key``."""
+    header = jwt.utils.base64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+    signing_input = header + b"." + jwt.utils.base64url_encode(payload)
+    signature = hmac.new(key.encode(), signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + jwt.utils.base64url_encode(signature)).decode()
+
+
+def _outcome(decode, token):
+    """Return ("ok", payload) or ("error", exception type) for a decode call."""
+    try:
+        return "ok", decode(token)
+    except Exception as e:
+        return "error", type(e)
+
+
+def _token_cases():
+    now = int(time.time())
+    return {
+        "valid": _encode({"sub": "user-1", "exp": now + 300, "iat": now}),
+        "valid_empty_aud": _encode({"sub": "user-1", "aud": ""}),
+        "expired": _encode({"sub": "user-1", "exp": now - 10}),
+        "iat_in_future": _encode({"sub": "user-1", "iat": now + 300}),
+        "nbf_in_future": _encode({"sub": "user-1", "nbf": now + 300}),
+        "non_integer_exp": _encode({"sub": "user-1", "exp": "soon"}),
+        "audience": _encode({"sub": "user-1", "aud": "other-service"}),
+        "wrong_alg": _encode({"sub": "user-1"}, algorithm="HS512"),
+        "alg_none": _encode({"sub": "user-1"}, key=None, algorithm="none"),
+        "bad_signature": _encode({"sub": "user-1"}, key="another-secret-that-is-32-bytes-long"),
+        "non_string_sub": _encode({"sub": 123}),
+        "non_string_jti": _encode({"sub": "user-1", "jti": 456}),
+        "bad_signature_garbage_payload": _forge(b"not json"),
+        "bad_signature_non_object_payload": _forge(b"[1, 2, 3]"),
+        "valid_non_object_payload": _forge(b"[1, 2, 3]", key=SECRET),
+        "malformed_segments": "abc.def",
+        "malformed_base64": "a.b.c",
+        "malformed_non_ascii": "é.é.é",
+    }
+
+
+class TestDecodeParity:
+    """_decode_jwt_hs256 must accept and reject exactly what jwt.decode does."""
+
+    @pytest.mark.parametrize("case", sorted(_token_cases()))
+    def test_matches_jwt_decode(self, auth_module, case):
+        token = _token_cases()[case]
+
+        expected = _outcome(
+            lambda t: jwt.decode(t, SECRET, algorithms=["HS256"]), token
+        )
+        actual = _outcome(auth_module._decode_jwt_hs256, token)
+
+        assert actual == expected
+
+    async def test_non_string_sub_is_rejected_by_authenticate(self, auth_module):
+        token = _encode({"sub": 123})
+
+        with pytest.raises(auth_module.Auth.exceptions.HTTPException) as exc_info:
+            await auth_module.authenticate({"authorization": f"Bearer {token}"})
+
+        assert exc_info.value.status_code == 401
+
+
+class TestAuthorizationHeader:
+    """Test authorization header lookup."""
+
+    @pytest.mark.parametrize("key", ["authorization", "Authorization", b"authorization"])
+    async def test_header_key_variants(self, auth_module, key):
+        token = _encode({"sub": "user-1"})
+        value = f"Bearer {token}"
+        headers = {key: value.encode() if isinstance(key, bytes) else value}
+
+        user = await auth_module.authenticate(headers)
+
+        assert user["identity"] == "user-1"
+
+
+class TestTokenCache:
+    """Test the verified-token cache used by authenticate."""
+
+    async def test_cache_hit_skips_decode(self, auth_module, monkeypatch):
+        calls = []
+        decode = auth_module._decode_jwt_hs256
+
+        def counting_decode(token):
+            calls.append(token)
+            return decode(token)
+
+        monkeypatch.setattr(auth_module, "_decode_jwt_hs256", counting_decode)
+        headers = {"authorization": f"Bearer {_encode({'sub': 'user-1'})}"}
+
+        first = await auth_module.authenticate(headers)
+        second = await auth_module.authenticate(headers)
+
+        assert len(calls) == 1
+        assert second is first
+
+    async def test_entry_expires_at_token_exp_when_sooner(self, auth_module):
+        now = time.time()
+        exp = int(now) + 10
+        token = _encode({"sub": "user-1", "exp": exp})
+
+        await auth_module.authenticate({"authorization": f"Bearer {token}"})
+
+        _, expires_at = auth_module._token_cache[auth_module._token_cache_key(token)]
+        assert expires_at == exp
+
+    async def test_string_exp_bounds_entry(self, auth_module, monkeypatch):
+        now = time.time()
+        exp = int(now) + 2
+        token = _encode({"sub": "user-1", "exp": str(exp)})
+        headers = {"authorization": f"Bearer {token}"}
+
+        await auth_module.authenticate(headers)
+
+        _, expires_at = auth_module._token_cache[auth_module._token_cache_key(token)]
+        assert expires_at == exp
+
+        # Once the token has expired it must be rejected, not served from cache
+        monkeypatch.setattr(auth_module.time, "time", lambda: exp + 1)
+        with pytest.raises(auth_module.Auth.exceptions.HTTPException) as exc_info:
+            await auth_module.authenticate(headers)
+        assert exc_info.value.status_code == 401
+
+    async def test_entry_expires_after_ttl_without_exp(self, auth_module):
+        token = _encode({"sub": "user-1"})
+        before = time.time()
+
+        await auth_module.authenticate({"authorization": f"Bearer {token}"})
+
+        _, expires_at = auth_module._token_cache[auth_module._token_cache_key(token)]
+        ttl = auth_module.TOKEN_CACHE_TTL
+        assert before + ttl <= expires_at <= time.time() + ttl
+
+    async def test_expired_entry_is_not_served(self, auth_module, monkeypatch):
+        token = _encode({"sub": "user-1"})
+        key = auth_module._token_cache_key(token)
+        await auth_module.authenticate({"authorization": f"Bearer {token}"})
+
+        later = time.time() + auth_module.TOKEN_CACHE_TTL + 1
+        monkeypatch.setattr(auth_module.time, "time", lambda: later)
+
+        assert auth_module._get_cached_user(key) is None
+        assert key not in auth_module._token_cache
+
+    def test_lru_eviction_at_maxsize(self, auth_module, monkeypatch):
+        monkeypatch.setattr(auth_module, "TOKEN_CACHE_MAXSIZE", 2)
+        users = {name: {"identity": name} for name in ("a", "b", "c")}
+
+        auth_module._cache_user(b"a", users["a"], None)
+        auth_module._cache_user(b"b", users["b"], None)
+        # Touch "a" so "b" becomes least recently used
+        assert auth_module._get_cached_user(b"a") is users["a"]
+        auth_module._cache_user(b"c", users["c"], None)
+
+        assert len(auth_module._token_cache) == 2
+        assert auth_module._get_cached_user(b"b") is None
+        assert auth_module._get_cached_user(b"a") is users["a"]
+        assert auth_module._get_cached_user(b"c") is users["c"]
@@ -0,0 +1,226 @@
+"""
+Unit tests for the enhanced Langfuse integration.
+Tests the disabled (no-op) path and the enabled path with a stubbed client.
+"""
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+from agent_server.observability import langfuse_enhanced
+from agent_server.observability.langfuse_enhanced import LangfuseEnhanced, _NoopLangfuse
+
+
+class StubLangfuseClient:
+    """Records spans and scores instead of talking to Langfuse."""
+
+    def __init__(self):
+        self.spans = []
+        self.scores = []
+
+    @contextmanager
+    def start_as_current_span(self, **kwargs):
+        self.spans.append(kwargs)
+        yield kwargs
+
+    def create_score(self, **kwargs):
+        self.scores.append(kwargs)
+
+
+@pytest.fixture
+def enabled_langfuse(monkeypatch):
+    """LangfuseEnhanced wired to a stub client, without importing langfuse."""
+    monkeypatch.setattr(langfuse_enhanced, "_LANGFUSE_LOGGING_ENABLED", False)
+    instance = LangfuseEnhanced()
+    instance.enabled = True
+    instance.client = StubLangfuseClient()
+    return instance
+
+
+class TestNoopLangfuse:
+    """Test the no-op instance used when tracing is disabled."""
+
+    def test_operations_do_nothing(self):
+        noop = _NoopLangfuse()
+
+        assert noop.get_callbacks() == ()
+        assert noop.score_trace("trace-1", "quality", 1.0) is None
+        assert noop.log_user_feedback("trace-1", 1) is None
+        assert noop.log_llm_judge_score("trace-1", "toxicity", 0.0) is None
+        assert noop.create_dataset("dataset") is None
+        assert noop.add_dataset_item("dataset", {"q": "hi"}) is None
+        assert noop.run_on_dataset("dataset", "run", agent_executor=None) == []
+        assert noop.flush() is None
+
+    def test_trace_agent_run_yields_none_from_shared_context(self):
+        noop = _NoopLangfuse()
+
+        first = noop.trace_agent_run("agent", "thread-1")
+        second = noop.trace_agent_run("agent", "thread-2", run_id="run-1")
+
+        assert first is second is langfuse_enhanced._NULL_TRACE
+        with first as span:
+            assert span is None
+
+    def test_invalid_calls_fail_like_the_real_instance(self):
+        noop = _NoopLangfuse()
+
+        with pytest.raises(TypeError):
+            noop.trace_agent_run()
+        with pytest.raises(TypeError):
+            noop.score_trace("trace-1")
+        with pytest.raises(TypeError):
+            noop.create_dataset(unknown="x")
+
+
+class TestEnabledTraceAgentRun:
+    """Test span construction with a stubbed Langfuse client."""
+
+    def test_optional_tags_are_skipped(self, enabled_langfuse):
+        with enabled_langfuse.trace_agent_run("agent", "thread-1"):
+            pass
+
+        span = enabled_langfuse.client.spans[0]
+        assert span["tags"] == ["aegra_run", "agent:agent", "thread:thread-1"]
+        assert span["name"] == "agent-run"
+        assert span["session_id"] == "thread-1"
+
+    def test_all_tags_accept_non_str_ids(self, enabled_langfuse):
+        thread_id = uuid.uuid4()
+        run_id = uuid.uuid4()
+
+        with enabled_langfuse.trace_agent_run(
+            "agent", thread_id, run_id=run_id, user_id="user-1"
+        ) as span:
+            assert span is not None
+
+        assert enabled_langfuse.client.spans[0]["tags"] == [
+            "aegra_run",
+            "agent:agent",
+            f"thread:{thread_id}",
+            f"run:{run_id}",
+            "user:user-1",
+        ]
+
+    def test_caller_metadata_takes_precedence(self, enabled_langfuse):
+        caller_metadata = {"timestamp": "caller-time", "extra": 1}
+
+        with enabled_langfuse.trace_agent_run(
+            "agent", "thread-1", metadata=caller_metadata
+        ):
+            pass
+
+        metadata = enabled_langfuse.client.spans[0]["metadata"]
+        assert metadata == {
+            "timestamp": "caller-time",
+            "extra": 1,
+            "agent_name": "agent",
+            "thread_id": "thread-1",
+        }
+        # The caller's dict is copied, not modified
+        assert caller_metadata == {"timestamp": "caller-time", "extra": 1}
+
+    def test_score_trace_uses_client(self, enabled_langfuse):
+        enabled_langfuse.score_trace("trace-1", "quality", 0.5, comment="ok")
+
+        assert enabled_langfuse.client.scores == [{
+            "trace_id": "trace-1",
+            "name": "quality",
+            "value": 0.5,
+            "data_type": "NUMERIC",
+            "comment": "ok",
+        }]
+
+
+class TestUtcTimestamp:
+    """Test the per-second cached ISO timestamp."""
+
+    def test_matches_datetime_isoformat(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_last_timestamp", (-1, ""))
+        now = 1_700_000_000.75
+        monkeypatch.setattr(langfuse_enhanced.time, "time", lambda: now)
+
+        expected = datetime.fromtimestamp(int(now), tz=timezone.utc).isoformat()
+        assert langfuse_enhanced._utc_timestamp() == expected
+
+    def test_reformats_only_when_second_changes(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_last_timestamp", (-1, ""))
+        clock = [1_700_000_000.1]
+        monkeypatch.setattr(langfuse_enhanced.time, "time", lambda: clock[0])
+
+        first = langfuse_enhanced._utc_timestamp()
+        clock[0] = 1_700_000_000.9
+        assert langfuse_enhanced._utc_timestamp() is first
+
+        clock[0] = 1_700_000_001.0
+        assert langfuse_enhanced._utc_timestamp() == "2023-11-14T22:13:21+00:00"
+
+    def test_real_clock_format(self):
+        assert re.fullmatch(
+            r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\+00:00",
+            langfuse_enhanced._utc_timestamp(),
+        )
+
+
+class TestGetEnhancedLangfuse:
+    """Test the singleton accessor and its post-first-call fast path."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_singleton(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_enhanced_instance", None)
+        # Start from the original accessor, not a previously swapped-in fast path
+        accessor = langfuse_enhanced.get_enhanced_langfuse
+        monkeypatch.setattr(
+            langfuse_enhanced, "get_enhanced_langfuse",
+            getattr(accessor, "__wrapped__", accessor),
+        )
+
+    def test_disabled_environment_yields_noop(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_LANGFUSE_LOGGING_ENABLED", False)
+
+        assert isinstance(langfuse_enhanced.get_enhanced_langfuse(), _NoopLangfuse)
+
+    def test_repeated_calls_return_same_instance(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_LANGFUSE_LOGGING_ENABLED", False)
+        original = langfuse_enhanced.get_enhanced_langfuse
+
+        first = original()
+        second = langfuse_enhanced.get_enhanced_langfuse()
+
+        assert langfuse_enhanced.get_enhanced_langfuse is not original
+        assert second is first
+        assert original() is first
+
+    def test_resetting_global_recreates_instance(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_LANGFUSE_LOGGING_ENABLED", False)
+        first = langfuse_enhanced.get_enhanced_langfuse()
+
+        langfuse_enhanced._enhanced_instance = None
+        second = langfuse_enhanced.get_enhanced_langfuse()
+
+        assert second is not first
+        assert langfuse_enhanced._enhanced_instance is second
+
+    def test_enabled_environment_yields_real_instance(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_LANGFUSE_LOGGING_ENABLED", True)
+        handler = object()
+
+        def fake_initialize(instance):
+            instance.client = StubLangfuseClient()
+            instance.handler = handler
+
+        monkeypatch.setattr(LangfuseEnhanced, "_initialize", fake_initialize)
+
+        instance = langfuse_enhanced.get_enhanced_langfuse()
+
+        assert type(instance) is LangfuseEnhanced
+        assert instance.get_callbacks() == (handler,)
+        assert langfuse_enhanced.get_tracing_callbacks() == [handler]
+
+    def test_disabled_tracing_callbacks_skip_singleton(self, monkeypatch):
+        monkeypatch.setattr(langfuse_enhanced, "_LANGFUSE_LOGGING_ENABLED", False)
+
+        assert langfuse_enhanced.get_tracing_callbacks() == []
+        assert langfuse_enhanced._enhanced_instance is None